@@ -2,14 +2,27 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import importlib
 from .db import ModelRegistry
 
 # Initialize Registry
 registry = ModelRegistry()
 
-from . import tools
-from . import security
-from . import fields
-from . import models
-from . import jsonrpc
-from . import storage
\ No newline at end of file
+# Submodules are imported lazily (see __getattr__), so
+# importing olaf alone doesn't open a database connection.
+# Call bootstrap() to import all of them at once.
+SUBMODULES = ("tools", "security", "fields", "models", "jsonrpc", "storage")
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+
+def bootstrap():
+    """ Import all framework submodules, so their 
+    models and routes get registered.
+    """
+    for name in SUBMODULES:
+        importlib.import_module("." + name, __name__)
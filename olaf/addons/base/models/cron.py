@@ -1,5 +1,9 @@
 from olaf import models, fields, registry
 
+# Fields the scheduler keeps track of in memory
+SCHEDULER_FIELDS = frozenset([
+    "name", "nextcall", "interval", "interval_type", "active", "code"])
+
 
 @registry.add
 class Cron(models.Model):
@@ -15,16 +19,24 @@ class Cron(models.Model):
 
     # Restart scheduler whenever
     # a job is either created, 
-    # modified or deleted
+    # modified or deleted, as long
+    # as the change affects it.
     
     def write(self, *args, **kwargs):
         super().write(*args, **kwargs)
-        self._reset_scheduler()
+        vals = args[0] if args else kwargs.get("vals", {})
+        if SCHEDULER_FIELDS.intersection(vals):
+            self._reset_scheduler()
         return
 
     def create(self, *args, **kwargs):
         result = super().create(*args, **kwargs)
-        self._reset_scheduler()
+        vals_list = args[0] if args else kwargs.get("vals_list", [])
+        if isinstance(vals_list, dict):
+            vals_list = [vals_list]
+        # Inactive jobs are not loaded by the scheduler
+        if any(vals.get("active", True) for vals in vals_list):
+            self._reset_scheduler()
         return result
 
     def unlink(self, *args, **kwargs):
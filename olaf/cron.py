@@ -4,10 +4,13 @@ from olaf.tools import config
 from olaf.storage import AppContext
 from olaf.tools.safe_eval import safe_eval
 from olaf.tools.environ import Environment
+from pymongo import UpdateOne
 from multiprocessing import Pool, TimeoutError
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from functools import lru_cache
 import dateutil
+import heapq
 import threading
 import logging
 import time
@@ -24,6 +27,21 @@ LOCALS = {
     "logger": logger
 }
 
+# Maximum amount of seconds the loop sleeps in a row.
+# Deadlines are wall-clock datetimes while waits are not,
+# so waking up now and then catches up with clock changes.
+MAX_WAIT = 60
+
+
+@lru_cache(maxsize=256)
+def get_delta(interval_type, interval):
+    """ Returns a relativedelta for the given interval.
+    Results are cached, since relativedelta objects are
+    never modified in place.
+    """
+    return relativedelta(**{interval_type: interval})
+
+
 class SchedulerMeta(type):
     """ This class ensures there's always a single
     instance of the Scheduler class along the entire
@@ -46,6 +64,22 @@ class Scheduler(metaclass=SchedulerMeta):
         self.timeout = timeout
         self.jobs = None
         self.heartbeat = heartbeat
+        self._wake = threading.Event()
+        self._code_cache = dict()
+        self._conn = Connection()
+        self._client = self._conn.cl
+        self._cron = self._conn.db["base.cron"]
+        # Neither the config nor the shell context change
+        # after boot, so check them just once.
+        self._disabled = False
+        if config.SCHEDULER_DISABLE:
+            # Prevent from starting if explicitly disabled in config
+            logger.warning("Unable to start scheduler (disabled per config)")
+            self._disabled = True
+        elif AppContext().read("shell"):
+            # Prevent from starting while in shell context
+            logger.warning("Scheduler is disabled in shell context")
+            self._disabled = True
         self.start()
 
     def start(self):
@@ -53,96 +87,144 @@ class Scheduler(metaclass=SchedulerMeta):
         if self.jobs is not None:
             return
 
-        # Prevent from starting if explicitly disabled in config
-        if config.SCHEDULER_DISABLE:
-            logger.warning("Unable to start scheduler (disabled per config)")
+        # Prevent from starting if disabled (see __init__)
+        if self._disabled:
             return
 
-        # Prevent from starting while in shell context
-        ctx = AppContext()
-        if ctx.read("shell"):
-            logger.warning("Scheduler is disabled in shell context")
-            return
+        cron = self._cron
 
-        conn = Connection()
-
-        # Get all active jobs
-        jobs = conn.db["base.cron"].find({"active": True})
-        # Update all nextcalls older than current time
+        # Get all active jobs and load them into memory.
+        # Jobs are also kept in a min-heap of (nextcall, _id, job)
+        # so the loop only needs to look at the earliest one.
+        # Since _id is unique, job dicts are never compared.
+        jobs = cron.find({"active": True})
+        self.jobs = dict()
+        self._heap = list()
+        ops = list()
+        now = datetime.now()
         for job in jobs:
-            now = datetime.now()
+            job["_delta"] = get_delta(job["interval_type"], job["interval"])
+            # A job whose interval doesn't move its nextcall
+            # forward would be due again right away, making
+            # the loop run it over and over without waiting.
+            if now + job["_delta"] <= now:
+                logger.warning(
+                    "Skipping job %s (%s): interval must be positive",
+                    job["_id"], job["name"])
+                continue
+            # Update nextcall if older than current time
             if now > job["nextcall"]:
-                delta_kwarg = {job["interval_type"]: job["interval"]}
-                new_nextcall = now + relativedelta(**delta_kwarg)
-                conn.db["base.cron"].update_one(
+                job["nextcall"] = now + job["_delta"]
+                ops.append(UpdateOne(
                     {"_id": job["_id"]},
-                    {"$set": {"nextcall": new_nextcall }})
-                
-        # Iterate again to get updated values    
-        # and load them into memory
-        jobs.rewind()
-        self.jobs = dict()
-        for job in jobs:
+                    {"$set": {"nextcall": job["nextcall"]}}))
             self.jobs[job["_id"]] = job
+            self._heap.append((job["nextcall"], job["_id"], job))
+        if ops:
+            cron.bulk_write(ops, ordered=False)
+        heapq.heapify(self._heap)
+
+        # Drop compiled code of jobs that changed or no longer exist
+        live = {(job["_id"], job["code"]) for job in self.jobs.values()}
+        self._code_cache = {
+            k: v for k, v in self._code_cache.items() if k in live}
 
+        self._wake.clear()
         self.running = True
         self.process = threading.Thread(
             name="SchedulerLoop", target=self.loop)
         self.process.start()
 
     def stop(self):
+        if self._disabled:
+            return
         self.running = False
         self.jobs = None
-        while self.process.is_alive():
-            time.sleep(1)
+        # Wake the loop up so it can exit right away
+        self._wake.set()
+        self.process.join()
 
     def reset(self):
         self.stop()
         self.start()
 
     def loop(self):
-        conn = Connection()
+        cron = self._cron
         logger.debug("Starting Scheduler Loop")
         # Initialize Heartbeat
         if self.heartbeat > 0:
-            next_hb = datetime.now() + timedelta(seconds=self.heartbeat)
+            hb_delta = timedelta(seconds=self.heartbeat)
+            next_hb = datetime.now() + hb_delta
+        # The heap is only replaced by start(), 
+        # which always runs a fresh loop.
+        heap = self._heap
         while self.running:
-            for job_id, job in self.jobs.items():
-                # Nextcall overpassed, execute job
+            # A single timestamp is taken per pass and shared
+            # by every job due in it. Intervals can't be shorter
+            # than a second, so this is precise enough.
+            now = datetime.now()
+            # Pop every job whose nextcall was overpassed
+            ops = list()
+            while heap and now > heap[0][0]:
+                _, job_id, job = heapq.heappop(heap)
+                self.run(job)
+                # TODO: Reusing 'now' reduces time drifting, but
+                # if the job takes longer than its delta, the new
+                # nextcall is already past once it finishes, so
+                # the job runs again back-to-back.
+                new_nextcall = now + job["_delta"]
+                # Update Internal Value
+                job["nextcall"] = new_nextcall
+                heapq.heappush(heap, (new_nextcall, job_id, job))
+                ops.append(UpdateOne(
+                    {"_id": job_id},
+                    {"$set": {"nextcall": new_nextcall}}))
+            # Update Database Entries
+            if ops:
+                cron.bulk_write(ops, ordered=False)
+            # Jobs may have taken a while, take a fresh
+            # timestamp (just once) if any of them ran.
+            if ops:
                 now = datetime.now()
-                if now > job["nextcall"]:
-                    self.run(job)
-                    delta_kwarg = {job["interval_type"]: job["interval"]}
-                    # TODO: Reusing 'now' reduces time drifting, but
-                    # will make the job fall behind the nextcall if it
-                    # takes longer than its delta, and therefore the app
-                    # won't run it again until restart.
-                    new_nextcall = now + relativedelta(**delta_kwarg)
-                    # Update Internal Value
-                    self.jobs[job_id]["nextcall"] = new_nextcall
-                    # Update Database Entry
-                    conn.db["base.cron"].update_one(
-                        {"_id": job_id},
-                        {"$set": {"nextcall": new_nextcall}})
             # Handle Heartbeat
             if self.heartbeat > 0:
-                if datetime.now() > next_hb:
+                if now > next_hb:
                     logger.info("Scheduler Heartbeat")
-                    next_hb = datetime.now() + timedelta(seconds=self.heartbeat)
-            time.sleep(1)
+                    next_hb = now + hb_delta
+            # Sleep until either the next job or the next
+            # heartbeat is due, or until stop() wakes us up.
+            deadlines = list()
+            if heap:
+                deadlines.append(heap[0][0])
+            if self.heartbeat > 0:
+                deadlines.append(next_hb)
+            timeout = MAX_WAIT
+            if deadlines:
+                timeout = min(
+                    MAX_WAIT,
+                    max(0, (min(deadlines) - now).total_seconds()))
+            self._wake.wait(timeout=timeout)
         logger.debug("Scheduler Loop has been terminated")
 
     def run(self, job):
-        logger.info("Running job {} ({})...".format(job["_id"], job["name"]))
+        logger.info("Running job %s (%s)...", job["_id"], job["name"])
         
         # Generate context variables
-        conn = Connection()
-        client = conn.cl
-
-        with client.start_session() as session:
+        with self._client.start_session() as session:
             with session.start_transaction():
                 env = Environment(job["_id"], session)
                 _locals = {**LOCALS, "env": env}
-                safe_eval(job["code"], _locals)
+                safe_eval(self.compile(job), _locals)
                 return
-                
\ No newline at end of file
+
+    def compile(self, job):
+        """ Returns the compiled code of a job, reusing
+        any previous compilation of the very same source.
+        """
+        key = (job["_id"], job["code"])
+        code = self._code_cache.get(key)
+        if code is None:
+            code = compile(
+                job["code"], "<cron:{}>".format(job["_id"]), "eval")
+            self._code_cache[key] = code
+        return code
@@ -1,10 +1,12 @@
 import os
 import logging
 import click
-from pymongo import MongoClient, DESCENDING
-from pymongo.errors import ServerSelectionTimeoutError
+from pymongo import MongoClient, InsertOne, UpdateMany, DeleteMany
+from pymongo.errors import CollectionInvalid, ServerSelectionTimeoutError
+from olaf.fields import Many2many, Many2one
 
 logger = logging.getLogger(__name__)
+MONGODB_STYLED = click.style("MongoDB", fg="white", bold=True)
 
 
 class ModelRegistryMeta(type):
@@ -47,25 +49,17 @@ class ModelRegistry(metaclass=ModelRegistryMeta):
         """ Classes wrapped around this method
         will be added to the registry.
         """
-        from olaf.fields import BaseField, Many2many, Many2one
         conn = Connection()
-        attrs = dir(cls)
 
         # Create collection if not present
-        if cls._name not in conn.db.list_collection_names():
-            conn.db.create_collection(cls._name)
-
-        # Handle Index and Compound Indexes creation
-        for attr_name in attrs:
-            attr = getattr(cls, attr_name)
-            if attr_name == "_compound_indexes":
-                for tup_ind in attr:
-                    conn.db[cls._name].create_index(
-                        [(ind, DESCENDING) for ind in tup_ind], unique=True)
-            if issubclass(attr.__class__, BaseField):
-                if attr._unique:
-                    conn.db[cls._name].create_index(attr_name, unique=True)
-            if issubclass(attr.__class__, Many2many):
+        conn.ensure_collection(cls._name)
+
+        # Create all of the indexes at once (see ModelMeta)
+        if cls.__indexes__:
+            conn.db[cls._name].create_indexes(cls.__indexes__)
+
+        for attr in cls.__fields__.values():
+            if isinstance(attr, Many2many):
                 # Look for m2m fields in the model definition
                 # and create intermediate models if necessary.
                 if attr._relation not in self.__models__:
@@ -82,13 +76,11 @@ class ModelRegistry(metaclass=ModelRegistryMeta):
                     model_dict[attr._field_b] = rel_fld_b
                     model_dict["_compound_indexes"] = [
                         (attr._field_a, attr._field_b)]
-                    for tup_ind in model_dict["_compound_indexes"]:
-                        conn.db[attr._relation].create_index(
-                            [(ind, DESCENDING) for ind in tup_ind], unique=True)
                     # Add attribute to distinguish intermediate models from others
                     model_dict["_intermediate"] = True
                     # Create metaclass
                     mod = ModelMeta("Model", (), model_dict)
+                    conn.db[attr._relation].create_indexes(mod.__indexes__)
                     self.__models__[attr._relation] = mod
 
         # Add class to the Registry
@@ -98,8 +90,8 @@ class ModelRegistry(metaclass=ModelRegistryMeta):
 
 class ConnectionMeta(type):
     """ This class ensures there's always a single
-    instance of the Connection class for each
-    application instance.
+    instance of the Connection class (and therefore
+    a single MongoClient) per process.
     """
     _instances = {}
 
@@ -114,9 +106,7 @@ class Connection(metaclass=ConnectionMeta):
     """ An instance of the Connection Client """
 
     def __init__(self):
-        color = click.style
-        logger.info("Initializing {} Connection".format(
-            color("MongoDB", fg="white", bold=True)))
+        logger.info("Initializing %s Connection", MONGODB_STYLED)
         from olaf.tools import config
         database = config.DB_NAME
         pswd = config.DB_PASS
@@ -131,25 +121,84 @@ class Connection(metaclass=ConnectionMeta):
         else:
             raise ValueError("MongoDB user or password were not specified")
 
-        # Create Client
+        # Create Client.
+        # MongoClient is thread-safe and pools its own
+        # sockets, so a single one is shared process-wide.
         params = {
-            "serverSelectionTimeoutMS": tout
+            "serverSelectionTimeoutMS": tout,
+            "maxPoolSize": config.DB_POOL_MAX,
+            "minPoolSize": config.DB_POOL_MIN
         }
 
         # Activate Replicaset
         params["replicaset"] = config.DB_REPLICASET_ID
 
-        # Instantiate MongoClient
+        # Enable wire compression, if requested.
+        # zstd and snappy require extra packages
+        # (zstandard, python-snappy) to be installed.
+        if config.DB_COMPRESSORS:
+            params["compressors"] = config.DB_COMPRESSORS
+
+        # Instantiate MongoClient.
+        # The client connects in background, so creating
+        # it doesn't block. See verify() for a sync check.
         client = MongoClient(connstr, **params)
 
-        # Verify Connection
+        self.cl = client
+        self.db = client[database]
+        # Collection names are listed on first use
+        # and kept up to date by ensure_collection()
+        self.__collections__ = None
+        # Collection objects, see collection()
+        self.__collection_objs__ = dict()
+
+    def verify(self):
+        """ Ensures the server is reachable, raising
+        RuntimeError otherwise.
+        """
         try:
-            client.server_info()
+            self.cl.admin.command("ping")
         except ServerSelectionTimeoutError as e:
             raise RuntimeError("Unable to connect to MongoDB: {}".format(e))
 
-        self.cl = client
-        self.db = client[database]
+    def collection(self, name):
+        """ Returns the Collection object for the given name,
+        building it only once.
+        """
+        coll = self.__collection_objs__.get(name)
+        if coll is None:
+            coll = self.__collection_objs__[name] = self.db[name]
+        return coll
+
+    def ensure_collection(self, name):
+        """ Creates the given collection if it doesn't exist.
+        """
+        if self.__collections__ is None:
+            self.__collections__ = set(self.db.list_collection_names())
+        if name not in self.__collections__:
+            try:
+                self.db.create_collection(name)
+            except CollectionInvalid:
+                # Created by someone else after listing
+                pass
+            self.__collections__.add(name)
+
+
+class NoAutoFlush:
+    """ Suspends the automatic flush of a DocumentCache,
+    so every operation queued within the block can still
+    be discarded through clear().
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def __enter__(self):
+        self.threshold = self.cache.__threshold__
+        self.cache.__threshold__ = None
+
+    def __exit__(self, type, value, traceback):
+        self.cache.__threshold__ = self.threshold
 
 
 class DocumentCache():
@@ -158,10 +207,16 @@ class DocumentCache():
     latter does not exist yet in database.
     """
 
-    def __init__(self, session=None):
+    def __init__(self, session=None, threshold=None):
         self.__queue__ = list()
         self.__session__ = session
         self.__pending__ = set()
+        self.__conn__ = Connection()
+        # If set, the caché flushes itself once it
+        # holds this many operations. Callers relying
+        # on clear() to discard queued operations 
+        # (e.g. Model.load) must suspend it, see NoAutoFlush.
+        self.__threshold__ = threshold
 
     def append(self, op, model, oids=[], data=None):
         """
@@ -183,19 +238,34 @@ class DocumentCache():
             if isinstance(data, dict):
                 self.__pending__.add(data["_id"])
             elif isinstance(data, list):
-                for item in data:
-                    self.__pending__.add(item["_id"])
+                self.__pending__.update(item["_id"] for item in data)
             else:
                 raise ValueError(
                     "Expected dict or list of dicts, "
                     "got {} instead".format(data.__class__.__name__))
 
-        # Convert oids into list
-        if not isinstance(oids, list):
-            oids = [oids]
+        # Convert oids into list. Other collections of
+        # oids are accepted too; anything else is a single oid.
+        if type(oids) is not list:
+            if isinstance(oids, (tuple, set, frozenset)):
+                oids = list(oids)
+            elif not isinstance(oids, list):
+                oids = [oids]
+
+        # Merge consecutive writes on the very same documents,
+        # so a single $set carries all of their changes.
+        if op == "write" and self.__queue__:
+            last = self.__queue__[-1]
+            if last[0] == "write" and last[1] == model and last[2] == oids:
+                self.__queue__[-1] = (op, model, oids, {**last[3], **data})
+                return
 
         self.__queue__.append((op, model, oids, data))
 
+        # Flush in batches if a threshold was given
+        if self.__threshold__ and len(self.__queue__) >= self.__threshold__:
+            self.flush()
+
     def clear(self):
         """
         Wipes the entire caché
@@ -208,24 +278,31 @@ class DocumentCache():
         Persists all elements in the caché;
         then wipes all the data in it.
         """
-        conn = Connection()
+        conn = self.__conn__
+        # Consecutive operations on the same model are
+        # sent together in a single bulk_write.
+        # Operations are never reordered, so both the
+        # order within a model and among models is kept.
+        # Runs made of inserts only don't depend on each
+        # other, so the server may apply them unordered.
+        modname = None
+        ops = list()
+        ordered = False
         try:
             for tpl in self.__queue__:
-                modname = tpl[1]
+                if tpl[1] != modname:
+                    if ops:
+                        conn.collection(modname).bulk_write(
+                            ops, ordered=ordered, session=self.__session__)
+                    modname = tpl[1]
+                    ops = list()
+                    ordered = False
                 oids = tpl[2]
                 if tpl[0] == "create":
                     if isinstance(tpl[3], dict):
-                        conn.db[modname].insert_one(
-                            tpl[3],
-                            session=self.__session__)
-                        self.__pending__.remove(tpl[3]["_id"])
-                    elif isinstance(tpl[3], list):    
-                        conn.db[modname].insert_many(
-                            tpl[3],
-                            ordered=True,
-                            session=self.__session__)
-                        for item in tpl[3]:
-                            self.__pending__.remove(item["_id"])
+                        ops.append(InsertOne(tpl[3]))
+                    elif isinstance(tpl[3], list):
+                        ops.extend([InsertOne(item) for item in tpl[3]])
                     else:
                         raise ValueError(
                             "Invalid data format. "
@@ -233,20 +310,25 @@ class DocumentCache():
                             "got {} instead.".format(
                                 tpl[3].__class__.__name__))
                 elif tpl[0] == "write":
-                    conn.db[modname].update_many(
+                    ordered = True
+                    ops.append(UpdateMany(
                         {"_id": {"$in": oids}},
-                        {"$set": tpl[3]},
-                        session=self.__session__)
+                        {"$set": tpl[3]}))
                 elif tpl[0] == "delete":
-                    conn.db[modname].delete_many(
-                        {"_id": {"$in": oids}}, 
-                        session=self.__session__)
+                    ordered = True
+                    ops.append(DeleteMany(
+                        {"_id": {"$in": oids}}))
+            if ops:
+                conn.collection(modname).bulk_write(
+                    ops, ordered=ordered, session=self.__session__)
         except Exception:
             # Clear caché, then raise exception
             # This allows handling database errors
             # (Duplicate Keys, etc.)
             self.clear()
             raise
+        # Every document has been inserted by now,
+        # so none of them is pending anymore.
         self.clear()
 
     def is_pending(self, oid):
@@ -1,6 +1,26 @@
 import bson
 import datetime
 
+# Operations allowed on x2many assignments, mapped to
+# their tuple length and the position and type of the
+# tuple argument to be type-checked (if any).
+X2M_OPERATIONS = {
+    "create":   (2, 1, dict),       # Create a co-model record and link it
+    "write":    (3, 2, dict),       # Update a linked co-model record
+    "purge":    (2, None, None),    # Delete the co-model record
+    "remove":   (2, None, None),    # Unlink a co-model record
+    "add":      (2, None, None),    # Link an existing co-model record
+    "clear":    (1, None, None),    # Unlink all co-model records
+    "replace":  (2, 1, list),       # Clear, then add each element of the list
+}
+
+# Values accepted by Boolean fields besides bools
+BOOL_FALSY = frozenset(["false", "0", 0])
+BOOL_TRUTHY = frozenset(["true", "1", 1])
+
+# Default value of fields declared without one
+NO_DEFAULT = object()
+
 class NoPersist:
     """ Allows performing field assignments
     without persisting changes into database,
@@ -23,6 +43,10 @@ class BaseField:
     this class.
     """
 
+    __slots__ = (
+        "attr", "_required", "_unique", "_default",
+        "_exclude", "_setter", "_string")
+
     def __init__(self, *args, **kwargs):
         self.attr = None    # Silence Linters
         # Get basic attributes
@@ -31,17 +55,20 @@ class BaseField:
         # Unique fields are always required
         if self._unique:
             self._required = True
-        # Keep _default undeclared if not specified
-        if "default" in kwargs:
-            self._default = kwargs["default"]
+        # NO_DEFAULT tells apart fields without a default
+        # from those whose default value is None
+        self._default = kwargs.get("default", NO_DEFAULT)
         # Excluded fields won't be returned on read()
         self._exclude = kwargs.get("exclude", False)
         # Custom setter function allows overriding default behaviour
-        if "setter" in kwargs:
-            self._setter = kwargs["setter"]
+        self._setter = kwargs.get("setter")
         # For now set string for keyword args
         self._string = kwargs.get("string", self.attr)
 
+    def __set_name__(self, owner, name):
+        # Called by type() when the model class is created
+        self.attr = name
+
     def __set__(self, instance, value):
         if getattr(instance, "_implicit_save", True):
             instance.write({self.attr: value})
@@ -51,23 +78,29 @@ class BaseField:
         if instance is None:
             return self
         else:
-            count = instance.count()
-            if count == 1:
-                attr = self.attr
-                instance._cursor.rewind()
-                item = instance._cursor.next()
-            elif count == 0:
+            # Fetch at most two documents, which is enough
+            # to know whether the set holds a single one.
+            # This takes one query instead of a count plus
+            # a find, and leaves the DocSet's cursor alone.
+            # Only the requested field is sent back.
+            docs = list(instance.env.conn.collection(instance._name).find(
+                instance._query, {self.attr: 1},
+                limit=2, session=instance.env.session))
+            if len(docs) == 1:
+                return docs[0].get(self.attr)
+            elif not docs:
                 return
             else:
                 # Call ensure_one to raise ValueError
                 instance.ensure_one()
-            return item.get(attr)
 
     def __validate__(self, instance, value):
         if value is None and self._required:
             raise ValueError("Field {} is required".format(self.attr))
-        if hasattr(self, "_setter"):
-            # Get value from custom setter
+        if self._setter is not None:
+            # Get value from custom setter. It's looked up on
+            # the instance so models extending this one may
+            # override it.
             setter = getattr(instance, self._setter)
             value = setter(value)
         return value
@@ -77,6 +110,8 @@ class Identifier(BaseField):
     """ Field Class for storing Document ObjectIDs
     """
 
+    __slots__ = ()
+
     def __validate__(self, instance, value):
         if not isinstance(value, bson.ObjectId):
             try:
@@ -91,6 +126,8 @@ class Char(BaseField):
     """ Field Class for storing strings
     """
 
+    __slots__ = ("_max_length",)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         max_length = kwargs.get("max_length", 255)
@@ -101,7 +138,8 @@ class Char(BaseField):
 
     def __validate__(self, instance, value):
         if value is not None:
-            if not isinstance(value, str):
+            if type(value) is not str:
+                # Also turns str subclasses into plain strings
                 try:
                     value = str(value)
                 except TypeError:
@@ -117,6 +155,8 @@ class Selection(Char):
     """ This field works exactly like a Char does,
     but limiting its possible values to the given ones.
     """
+    __slots__ = ("_choices",)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         choices = kwargs.get("choices", [])
@@ -139,12 +179,14 @@ class Integer(BaseField):
     """ Field Class for storing integer numbers
     """
 
+    __slots__ = ()
+
     def __validate__(self, instance, value):
         if value is not None:
             if not isinstance(value, int):
                 try:
                     value = int(value)
-                except ValueError:
+                except (ValueError, TypeError):
                     raise ValueError(
                         "Cannot convert '{}' to integer".format(str(value)))
         return super().__validate__(instance, value)
@@ -154,12 +196,20 @@ class Boolean(BaseField):
     """ Field Class for storing boolean values
     """
 
+    __slots__ = ()
+
     def __validate__(self, instance, value):
         if value is not None:
-            if not isinstance(value, bool):
-                if value in ["false", "0", 0]:
+            if type(value) is not bool:
+                try:
+                    falsy = value in BOOL_FALSY
+                    truthy = not falsy and value in BOOL_TRUTHY
+                except TypeError:
+                    # Unhashable values can't be converted either
+                    falsy = truthy = False
+                if falsy:
                     value = False
-                elif value in ["true", "1", 1]:
+                elif truthy:
                     value = True
                 else:
                     raise ValueError(
@@ -170,6 +220,8 @@ class Boolean(BaseField):
 class DateTime(BaseField):
     """ Field Class for storing datetime values
     """
+    __slots__ = ()
+
     def __validate__(self, instance, value):
         if value is not None:
             if not isinstance(value, datetime.datetime):
@@ -186,6 +238,8 @@ class RelationalField(BaseField):
     for relational fields.
     """
 
+    __slots__ = ("_comodel_name", "_represent", "_comodel")
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         comodel_name = (args[0:1] or (None,))[0]
@@ -193,21 +247,35 @@ class RelationalField(BaseField):
             raise ValueError("comodel_name not specified")
         self._comodel_name = comodel_name
         self._represent = kwargs.get("represent", "name")
+        # Comodel class, resolved on first use
+        self._comodel = None
 
     def _get_comodel(self, instance):
-        if self._comodel_name is None:
-            raise ValueError("comodel_name not specified")
-        if self._comodel_name not in instance.env.registry:
-            raise ValueError("comodel_name '{}' not found in registry".format(self._comodel_name))
-        return instance.env[self._comodel_name]
+        comodel = self._comodel
+        if comodel is None:
+            if self._comodel_name is None:
+                raise ValueError("comodel_name not specified")
+            if self._comodel_name not in instance.env.registry:
+                raise ValueError("comodel_name '{}' not found in registry".format(self._comodel_name))
+            comodel = self._comodel = instance.env.registry[self._comodel_name]
+        return comodel(instance.env)
 
     def _ensure_oid(self, value):
         """ Ensure the provided value is an ObjectId or a compatible string """
+        if type(value) is bson.ObjectId:
+            return value
+        if type(value) is str:
+            # Check hex strings upfront instead of handling InvalidId
+            if not bson.ObjectId.is_valid(value):
+                raise TypeError(
+                    "The supplied value '{}' is not a valid ObjectId".format(value))
+            return bson.ObjectId(value)
         if not isinstance(value, bson.ObjectId):
-            from olaf.models import Model  # FIXME: Importing this here to avoid circular import
-            if issubclass(value.__class__, Model):
-                # The provided value is a DocSet
-                value.ensure_one()
+            # The provided value is a DocSet. Checked by duck typing,
+            # so olaf.models (which imports this module) isn't needed.
+            ensure_one = getattr(value, "ensure_one", None)
+            if ensure_one is not None:
+                ensure_one()
                 return value._id
             try:
                 value = bson.ObjectId(value)
@@ -226,8 +294,11 @@ class RelationalField(BaseField):
         """
         if instance.env.cache.is_pending(oid):
             return
-        item = instance.env[self._comodel_name].browse(oid)
-        if item.count() == 0:
+        item = self._get_comodel(instance).browse(oid)
+        # A point lookup on _id is cheaper than counting
+        exists = instance.env.conn.collection(self._comodel_name).find_one(
+            {"_id": oid}, {"_id": 1}, session=instance.env.session)
+        if exists is None:
             raise ValueError(
                 "The supplied ObjectId does not exist in the target model")
         return item
@@ -238,6 +309,8 @@ class Many2one(RelationalField):
     a record from a different collection or the same one
     """
 
+    __slots__ = ("_ondelete",)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._ondelete = kwargs.get("ondelete", "SET NULL")
@@ -255,34 +328,18 @@ class Many2one(RelationalField):
 
     def __validate__(self, instance, value):
         if value is not None:
-            _ = self._get_comodel(instance)
             value = self._ensure_oid(value)
             self._is_comodel_oid(value, instance)
         return super().__validate__(instance, value)
 
 
-class One2many(RelationalField):
-    """ Field Class for storing a list
-    of references to a given model
+class X2manyField(RelationalField):
+    """ Common behaviour of One2many and Many2many fields.
+    Each assignment tuple is handled by the _op_<operation>
+    method of the field class.
     """
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        inversed_by = (args[1:2] or (None,))[0] or kwargs["inversed_by"]
-        if inversed_by is None:
-            raise ValueError("inversed_by not specified")
-        self._inversed_by = inversed_by
-
-    def __get__(self, instance, owner):
-        if instance is None:
-            return self
-        instance.ensure_one()
-        cmod = self._get_comodel(instance)
-        if not hasattr(cmod, self._inversed_by):
-            raise AttributeError(
-                "Inverse relation '{}' not found in model '{}'".format(
-                    self._inversed_by, cmod._name))
-        return cmod.search({self._inversed_by: instance._id})
+    __slots__ = ()
 
     def __validate__(self, instance, list_tuples):
         for i, t in enumerate(list_tuples):
@@ -296,71 +353,30 @@ class One2many(RelationalField):
                     t = list_tuples[i] = ("clear",)
                 else:
                     raise TypeError(
-                        "One2many field assignments must be done through tuple-list syntax. "
-                        "Check the documentation for further details.")
+                        "{} field assignments must be done through tuple-list syntax. "
+                        "Check the documentation for further details.".format(
+                            self.__class__.__name__))
 
             if len(t) == 0:
                 raise ValueError("Empty tuple supplied for x2many assignment")
 
-            if t[0] == "create":
-                # Create a new record in the co-model
-                # and assign its 'inversed_by' field to this record.
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many create assignment")
-                if not isinstance(t[1], dict):
-                    raise TypeError(
-                        "Tuple argument #2 must be dict, got {} instead".format(
-                            t[1].__class__.__name__))
-            elif t[0] == "write":
-                # Update an existing record in the co-model
-                # by assigning its 'inversed_by' field to this record.
-                if len(t) != 3:
-                    raise ValueError(
-                        "Invalid tuple length for x2many write assignment")
-                if not isinstance(t[2], dict):
-                    raise TypeError(
-                        "Tuple argument #2 must be dict, got {} instead".format(
-                            t[2].__class__.__name__))
-            elif t[0] == "purge":
-                # Delete the co-model record
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many purge assignment")
-            elif t[0] == "remove":
-                # Remove the reference to this record by clearing
-                # the 'inversed_by' field in the co-model record
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many remove assignment")
-            elif t[0] == "add":
-                # Add a reference to this record by setting
-                # the 'inversed_by' field in the co-model record
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many add assignment")
-            elif t[0] == "clear":
-                # Set all the references to this record to None
-                if len(t) != 1:
-                    raise ValueError(
-                        "Invalid tuple length for x2many clear assignment")
-            elif t[0] == "replace":
-                # Perform a clear and then add each element of the supplied list
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many clear assignment")
-                if not isinstance(t[1], list):
-                    raise TypeError(
-                        "Tuple argument #2 must be list, got {} instead".format(
-                            t[1].__class__.__name__))
-            else:
+            spec = X2M_OPERATIONS.get(t[0])
+            if spec is None:
                 raise ValueError(
                     "Tuple #1 argument must be 'create', 'write', 'purge', 'remove', 'add', 'clear' or 'replace'")
-        
+            length, arg, arg_type = spec
+            if len(t) != length:
+                raise ValueError(
+                    "Invalid tuple length for x2many {} assignment".format(t[0]))
+            if arg is not None and not isinstance(t[arg], arg_type):
+                raise TypeError(
+                    "Tuple argument #2 must be {}, got {} instead".format(
+                        arg_type.__name__, t[arg].__class__.__name__))
+
         return list_tuples
 
     def __set__(self, instance, list_tuples):
-        """ Sets the value of a One2many relationship
+        """ Sets the value of an x2many relationship
 
         Since x2many fields are virtual, and in order to allow a 
         create() or write() operation involving this type of field without
@@ -381,71 +397,115 @@ class One2many(RelationalField):
         (5, 0, 0)           | ('clear')           | Unlink all (like using (3,ID) for all linked records)
         (6, 0, [IDs])       | ('replace', [OIDs]) | Replace the list of linked IDs (like using (5) then (4,ID) for each ID in the list of IDs)
         """
+        list_tuples = self.__validate__(instance, list_tuples)
+        deferred = not getattr(instance, "_implicit_save", True)
+        for t in list_tuples:
+            # Tuples were validated, so the operation exists.
+            # Handlers are looked up by name, so subclasses
+            # may override any of them.
+            getattr(self, "_op_" + t[0])(instance, t, deferred)
+
+
+class One2many(X2manyField):
+    """ Field Class for storing a list
+    of references to a given model
+    """
+
+    __slots__ = ("_inversed_by",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        inversed_by = (args[1:2] or (None,))[0] or kwargs["inversed_by"]
+        if inversed_by is None:
+            raise ValueError("inversed_by not specified")
+        self._inversed_by = inversed_by
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        instance.ensure_one()
+        cmod = self._get_comodel(instance)
+        if not hasattr(cmod, self._inversed_by):
+            raise AttributeError(
+                "Inverse relation '{}' not found in model '{}'".format(
+                    self._inversed_by, cmod._name))
+        return cmod.search({self._inversed_by: instance._id})
+
+    def _op_create(self, instance, t, deferred):
+        if deferred:
+            instance.env.cache.append("write", self._comodel_name, [bson.ObjectId()], t[1])
+        else:
+            t[1][self._inversed_by] = instance._id
+            instance.env[self._comodel_name].create(t[1])
+
+    def _op_write(self, instance, t, deferred):
+        if deferred:
+            instance.env.cache.append("write", self._comodel_name, t[1], t[2])
+        else:
+            oid = self._ensure_oid(t[1])
+            item = self._is_comodel_oid(oid, instance)
+            item.write(t[2])
+
+    def _op_purge(self, instance, t, deferred):
+        if deferred:
+            instance.env.cache.append("delete", self._comodel_name, t[1])
+        else:
+            oid = self._ensure_oid(t[1])
+            item = self._is_comodel_oid(oid, instance)
+            item.unlink()
+
+    def _op_remove(self, instance, t, deferred):
+        if deferred:
+            instance.env.cache.append("write", self._comodel_name, t[1], {self._inversed_by: None})
+        else:
+            oid = self._ensure_oid(t[1])
+            item = self._is_comodel_oid(oid, instance)
+            item.write({self._inversed_by: None})
+
+    def _op_add(self, instance, t, deferred):
+        if deferred:
+            instance.env.cache.append("write", self._comodel_name, t[1], {self._inversed_by: instance._id})
+        else:
+            oid = self._ensure_oid(t[1])
+            item = self._is_comodel_oid(oid, instance)
+            item.write({self._inversed_by: instance._id})
+
+    def _op_clear(self, instance, t, deferred):
         cmname = self._comodel_name
         inversed_by = self._inversed_by
-        list_tuples = self.__validate__(instance, list_tuples)
+        if deferred:
+            ids = instance.env[cmname].search({inversed_by: instance._id}).ids
+            if ids:
+                instance.env.cache.append("write", cmname, ids, {inversed_by: None})
+        else:
+            instance.env[cmname].search(
+                {inversed_by: instance._id}).write(
+                    {inversed_by: None})
 
-        for _, t in enumerate(list_tuples):
-            if not getattr(instance, "_implicit_save", True):
-                # Handle deferred write
-                if t[0] == "create":
-                    instance.env.cache.append("write", cmname, [bson.ObjectId()], t[1])
-                elif t[0] == "write":
-                    instance.env.cache.append("write", cmname, t[1], t[2])
-                elif t[0] == "purge":
-                    instance.env.cache.append("delete", cmname, t[1])
-                elif t[0] == "remove":
-                    instance.env.cache.append("write", cmname, t[1], {inversed_by: None})
-                elif t[0] == "add":
-                    instance.env.cache.append("write", cmname, t[1], {inversed_by: instance._id})
-                elif t[0] == "clear":
-                    docset = instance.env[cmname].search({inversed_by: instance._id})
-                    for item in docset:
-                        instance.env.cache.append("write", cmname, item._id, {inversed_by: None})
-                elif t[0] == "replace":
-                    docset = instance.env[cmname].search({inversed_by: instance._id})
-                    for item in docset:
-                        instance.env.cache.append("write", cmname, item._id, {inversed_by: None})
-                    new_docset = instance.env[cmname].browse(t[1])
-                    for item in new_docset:
-                        instance.env.cache.append("write", cmname, item._id, {inversed_by: instance._id})
-            else:
-                # Handle active write
-                if t[0] == "create":
-                    t[1][inversed_by] = instance._id
-                    instance.env[cmname].create(t[1])
-                elif t[0] == "write":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    item.write(t[2])
-                elif t[0] == "purge":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    item.unlink()
-                elif t[0] == "remove":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    item.write({inversed_by: None})
-                elif t[0] == "add":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    item.write({inversed_by: instance._id})
-                elif t[0] == "clear":
-                    instance.env[self._comodel_name].search(
-                        {inversed_by: instance._id}).write(
-                            {inversed_by: None})
-                elif t[0] == "replace":
-                    comodel = self._get_comodel(instance)
-                    comodel.search({inversed_by: instance._id}
-                                ).write({inversed_by: None})
-                    comodel.browse(t[1]).write({inversed_by: instance._id})
-                    
-
-class Many2many(RelationalField):
+    def _op_replace(self, instance, t, deferred):
+        cmname = self._comodel_name
+        inversed_by = self._inversed_by
+        if deferred:
+            ids = instance.env[cmname].search({inversed_by: instance._id}).ids
+            if ids:
+                instance.env.cache.append("write", cmname, ids, {inversed_by: None})
+            new_ids = instance.env[cmname].browse(t[1]).ids
+            if new_ids:
+                instance.env.cache.append("write", cmname, new_ids, {inversed_by: instance._id})
+        else:
+            comodel = self._get_comodel(instance)
+            comodel.search({inversed_by: instance._id}
+                        ).write({inversed_by: None})
+            comodel.browse(t[1]).write({inversed_by: instance._id})
+
+
+class Many2many(X2manyField):
     """ A many2many relationship works by creating an intermediate
     model with two Many2one fields, each one pointing to one of the
     involved models, resulting in a One2many field in  ends.
     """
+    __slots__ = ("_relation", "_field_a", "_field_b")
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._relation  = (args[1:2] or (None,))[0] or kwargs["relation"]
@@ -462,144 +522,92 @@ class Many2many(RelationalField):
         instance.ensure_one()
         # Perform search and browse
         rels = instance.env[self._relation].search({self._field_a: instance._id})
+        # Read comodel oids straight from the relations,
+        # instead of building a DocSet for each of them.
+        cursor = instance.env.conn.collection(self._relation).find(
+            rels._query, {self._field_b: 1}, session=instance.env.session)
         return instance.env[self._comodel_name].browse(
-            [getattr(rel, self._field_b)._id for rel in rels])
-
-    def __validate__(self, instance, list_tuples):
-
-        for i, t in enumerate(list_tuples):
-            
-            if t is None:
-                # Treat None assignment as clear
-                t = list_tuples[i] = ("clear",)
-
-            if not isinstance(t, tuple):
-                if t == 'clear':
-                    # Fix wrong singleton tuple
-                    t = list_tuples[i] = ("clear",)
-                else:
-                    raise TypeError(
-                        "Many2many field assignments must be done through tuple-list syntax. "
-                        "Check the documentation for further details.")
-
-            # Parameter validation
-            if t[0] == "create":
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many create assignment")
-                if not isinstance(t[1], dict):
-                    raise TypeError(
-                        "Tuple argument #2 must be dict, got {} instead".format(
-                            t[1].__class__.__name__))                
-            elif t[0] == "write":
-                if len(t) != 3:
-                    raise ValueError(
-                        "Invalid tuple length for x2many write assignment")
-                if not isinstance(t[2], dict):
-                    raise TypeError(
-                        "Tuple argument #2 must be dict, got {} instead".format(
-                            t[2].__class__.__name__))
-            elif t[0] == "purge":
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many purge assignment")
-            elif t[0] == "remove":
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many remove assignment")
-            elif t[0] == "add":
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many add assignment")
-            elif t[0] == "clear":
-                if len(t) != 1:
-                    raise ValueError(
-                        "Invalid tuple length for x2many clear assignment")
-            elif t[0] == "replace":
-                if len(t) != 2:
-                    raise ValueError(
-                        "Invalid tuple length for x2many clear assignment")
-                if not isinstance(t[1], list):
-                    raise TypeError(
-                        "Tuple argument #2 must be list, got {} instead".format(
-                            t[1].__class__.__name__))
-            else:
-                raise ValueError(
-                    "Tuple #1 argument must be 'create', 'write', 'purge', 'remove', 'add', 'clear' or 'replace'")
-        
-        return list_tuples
+            [rel[self._field_b] for rel in cursor])
+
+    def _op_create(self, instance, t, deferred):
+        fld_a, fld_b = self._field_a, self._field_b
+        if deferred:
+            oid = bson.ObjectId()
+            instance.env.cache.append("write", self._comodel_name, oid, t[1])
+            instance.env.cache.append("write", self._relation, bson.ObjectId(), {fld_a: instance._id, fld_b: oid})
+        else:
+            rec = instance.env[self._comodel_name].create(t[1])
+            instance.env[self._relation].create(
+                {fld_a: instance._id, fld_b: rec._id})
 
-    def __set__(self, instance, list_tuples):
-        """ A patched version of the O2M __validate__ descriptor.
-        """
-        fld_a =     self._field_a
-        fld_b =     self._field_b
-        cmname =    self._comodel_name
-        relname =   self._relation
+    def _op_write(self, instance, t, deferred):
+        if deferred:
+            instance.env.cache.append("write", self._comodel_name, t[1], t[2])
+        else:
+            oid = self._ensure_oid(t[1])
+            item = self._is_comodel_oid(oid, instance)
+            item.write(t[2])
+
+    def _op_purge(self, instance, t, deferred):
+        relname = self._relation
+        if deferred:
+            rel = instance.env[relname].search({self._field_a: instance._id, self._field_b: t[1]})
+            instance.env.cache.append("delete", relname, rel._id)
+            instance.env.cache.append("delete", self._comodel_name, t[1])
+        else:
+            oid = self._ensure_oid(t[1])
+            item = self._is_comodel_oid(oid, instance)
+            instance.env[relname].search({self._field_b: oid}).unlink()
+            item.unlink()
+
+    def _op_remove(self, instance, t, deferred):
+        relname = self._relation
+        if deferred:
+            rel = instance.env[relname].search({self._field_a: instance._id, self._field_b: t[1]})
+            instance.env.cache.append("delete", relname, rel._id, {})
+        else:
+            oid = self._ensure_oid(t[1])
+            _ = self._is_comodel_oid(oid, instance)
+            instance.env[relname].search({self._field_b: oid}).unlink()
+
+    def _op_add(self, instance, t, deferred):
+        fld_a, fld_b = self._field_a, self._field_b
+        relname = self._relation
+        if deferred:
+            instance.env.cache.append("write", relname, bson.ObjectId(), {fld_a: instance._id, fld_b: t[1]})
+        else:
+            oid = self._ensure_oid(t[1])
+            item = self._is_comodel_oid(oid, instance)
+            # Check if relation exists before adding it
+            if not instance.env[relname].search(
+                    {fld_a: instance._id, fld_b: item._id}):
+                instance.env[relname].create(
+                    {fld_a: instance._id, fld_b: item._id})
+
+    def _op_clear(self, instance, t, deferred):
+        relname = self._relation
+        if deferred:
+            ids = instance.env[relname].search({self._field_a: instance._id}).ids
+            if ids:
+                instance.env.cache.append("delete", self._comodel_name, ids)
+        else:
+            instance.env[relname].search({self._field_a: instance._id}).unlink()
+
+    def _op_replace(self, instance, t, deferred):
+        fld_a, fld_b = self._field_a, self._field_b
+        relname = self._relation
+        if deferred:
+            ids = instance.env[relname].search({fld_a: instance._id}).ids
+            if ids:
+                instance.env.cache.append("delete", self._comodel_name, ids)
+            for oid in t[1]:
+                instance.env.cache.append("write", relname, bson.ObjectId(), {fld_a: instance._id, fld_b: oid})
+        else:
+            instance.env[relname].search({fld_a: instance._id}).unlink()
+            # Create all relations at once. The Many2one fields
+            # of the intermediate model ensure each oid exists.
+            oids = [self._ensure_oid(oid) for oid in t[1]]
+            if oids:
+                instance.env[relname].create(
+                    [{fld_a: instance._id, fld_b: oid} for oid in oids])
 
-        list_tuples = self.__validate__(instance, list_tuples)
-        
-        for _, t in enumerate(list_tuples):
-            if not getattr(instance, "_implicit_save", True):
-                # Handle deferred write
-                if t[0] == "create":
-                    oid = bson.ObjectId()
-                    instance.env.cache.append("write", cmname, oid, t[1])
-                    instance.env.cache.append("write", relname, bson.ObjectId(), {fld_a: instance._id, fld_b: oid})
-                elif t[0] == "write":
-                    instance.env.cache.append("write", cmname, t[1], t[2])
-                elif t[0] == "purge":
-                    rel = instance.env[relname].search({fld_a: instance._id, fld_b: oid})
-                    instance.env.cache.append("delete", relname, rel._id)
-                    instance.env.cache.append("delete", cmname, t[1])
-                elif t[0] == "remove":
-                    rel = instance.env[relname].search({fld_a: instance._id, fld_b: oid})
-                    instance.env.cache.append("delete", relname, rel._id, {})
-                elif t[0] == "add":
-                    instance.env.cache.append("write", relname, bson.ObjectId(), {fld_a: instance._id, fld_b: t[1]})
-                elif t[0] == "clear":
-                    docset = instance.env[relname].search({fld_a: instance._id})
-                    for item in docset:
-                        instance.env.cache.append("delete", cmname, item._id)
-                elif t[0] == "replace":
-                    docset = instance.env[relname].search({fld_a: instance._id})
-                    for item in docset:
-                        instance.env.cache.append("delete", cmname, item._id)
-                    for oid in t[1]:
-                        instance.env.cache.append("write", relname, bson.ObjectId(), {fld_a: instance._id, fld_b: oid})
-            else:
-                # Handle active write
-                if t[0] == "create":
-                    rec = instance.env[cmname].create(t[1])
-                    instance.env[relname].create(
-                        {fld_a: instance._id, fld_b: rec._id})
-                elif t[0] == "write":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    item.write(t[2])
-                elif t[0] == "purge":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    instance.env[relname].search({fld_b: oid}).unlink()
-                    item.unlink()
-                elif t[0] == "remove":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    instance.env[relname].search({fld_b: oid}).unlink()
-                elif t[0] == "add":
-                    oid = self._ensure_oid(t[1])
-                    item = self._is_comodel_oid(oid, instance)
-                    # Check if relation exists before adding it
-                    if not instance.env[relname].search(
-                            {fld_a: instance._id, fld_b: item._id}):
-                        instance.env[relname].create(
-                            {fld_a: instance._id, fld_b: item._id})
-                elif t[0] == "clear":
-                    instance.env[relname].search({fld_a: instance._id}).unlink()
-                elif t[0] == "replace":
-                    instance.env[relname].search({fld_a: instance._id}).unlink()
-                    for oid in t[1]:
-                        oid = self._ensure_oid(oid)
-                        _ = self._is_comodel_oid(oid, instance)
-                        instance.env[relname].create(
-                            {fld_a: instance._id, fld_b: oid})
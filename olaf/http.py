@@ -1,6 +1,11 @@
 import json
 import os
 import logging
+try:
+    # Optional, faster JSON serializer
+    import orjson
+except ImportError:
+    orjson = None
 from bson import ObjectId
 from jinja2 import Environment as Jinja2Environment, FileSystemLoader
 from werkzeug.wrappers import Request as WZRequest, Response as WZResponse
@@ -8,6 +13,7 @@ from werkzeug.exceptions import BadRequest
 from werkzeug.wrappers.json import JSONMixin
 from werkzeug.wrappers.cors import CORSResponseMixin
 from werkzeug.routing import Map, Rule, NotFound, MethodNotAllowed, BadHost, BadRequest, HTTPException, RoutingException, ValidationError
+from werkzeug.wsgi import get_host, get_path_info, get_script_name
 from olaf import registry
 from olaf.tools import config
 
@@ -22,6 +28,27 @@ WZ_ROUTING_EXCEPTIONS = (
     RoutingException, 
     ValidationError,)
 
+# CORS headers are built once out of the (read-only) config
+CORS_HEADERS = (
+    ("Access-Control-Allow-Origin", config.CORS_ALLOW_ORIGIN),
+    ("Access-Control-Allow-Methods", "POST, GET"),
+    ("Access-Control-Allow-Headers", ", ".join([
+        "Access-Control-Allow-Headers",
+        "Content-Type",
+        "Authorization",
+        "X-Requested-With"])),)
+OPTIONS_HEADERS = (
+    ("Content-Type", "text/plain; charset=utf-8"),
+    ("Content-Length", "0"),
+    ("Access-Control-Max-Age", str(3600 * 24)),
+    *CORS_HEADERS,)
+
+# Plain 404 response for unmatched URLs, served if HTML_NOT_FOUND is off
+NOT_FOUND_BODY = b"Not Found"
+NOT_FOUND_HEADERS = (
+    ("Content-Type", "text/plain; charset=utf-8"),
+    ("Content-Length", str(len(NOT_FOUND_BODY))),)
+
 class Request(WZRequest, JSONMixin):
     """ Standard Werkzeug Request with JSON Mixin """
 
@@ -44,10 +71,9 @@ class JsonResponse(Response):
     def __init__(self, *args, **kwargs):
         if args[0] is not None:
             list_args = list(args)
-            list_args[0] = json.dumps(args[0], default=OlafJSONEncoder)
+            list_args[0] = json_dumps(args[0])
         elif "response" in kwargs:
-            kwargs["response"] = json.dumps(
-                kwargs["response"], default=OlafJSONEncoder)
+            kwargs["response"] = json_dumps(kwargs["response"])
         kwargs["content_type"] = "application/json"
         super().__init__(*list_args, **kwargs)
 
@@ -77,6 +103,7 @@ class RouteMap(metaclass=RouteMapMeta):
     def __init__(self):
         self.pre_map = dict()
         self.url_map = None
+        self.static_map = dict()
 
     def __call__(self):
         return self.url_map
@@ -114,49 +141,111 @@ class RouteMap(metaclass=RouteMapMeta):
             self.url_map = Map([])
             for rule in self.pre_map.values():
                 self.url_map.add(rule)
+                # Rules without converters are also indexed
+                # by (method, path), so they can be resolved
+                # without going through the regex matcher.
+                if not rule.arguments:
+                    for method in rule.methods or [None]:
+                        self.static_map[(method, rule.rule)] = rule.endpoint
         return self.url_map
 
+    def match_static(self, path, method):
+        """ 
+        Return the endpoint of a converter-less rule
+        matching the given path and method, or None
+        if there's no such rule.
+        """
+        endpoint = self.static_map.get((method, path))
+        if endpoint is None:
+            endpoint = self.static_map.get((None, path))
+        return endpoint
+
 
 # Instantiate RouteMap
 route = RouteMap()
 
 
+# URL Map adapters, see bind_url_map()
+URL_ADAPTERS = dict()
+URL_ADAPTERS_MAX = 32
+
+
+def bind_url_map(url_map, env):
+    """ 
+    Bind the URL Map to the given WSGI environment, the
+    way Map.bind_to_environ does. The resulting adapter 
+    holds no request state, so it is shared among requests
+    and threads. Since the Host header is client-controlled,
+    only the first few adapters are kept; further ones are 
+    bound on every request instead of evicting them.
+    """
+    server_name = get_host(env).lower()
+    script_name = get_script_name(env, url_map.charset)
+    url_scheme = env["wsgi.url_scheme"]
+    key = (server_name, script_name, url_scheme)
+    urls = URL_ADAPTERS.get(key)
+    if urls is None:
+        urls = url_map.bind(
+            server_name, script_name=script_name,
+            subdomain="", url_scheme=url_scheme)
+        if len(URL_ADAPTERS) < URL_ADAPTERS_MAX:
+            URL_ADAPTERS[key] = urls
+    return urls
+
+
+def get_query_args(env, charset):
+    """ Returns the query string decoded 
+    the way Map.bind_to_environ does.
+    """
+    query_args = env.get("QUERY_STRING")
+    if query_args is not None:
+        query_args = query_args.encode("latin1").decode(charset, "replace")
+    return query_args
+
+
 def dispatch(env, start_response):
     """ 
     Main HTTP entrypoint
     """
 
-    # Bind URL Map
-    url_map = route.url_map
-    urls = url_map.bind_to_environ(env)
-    request = Request(env)  # pylint: disable=assigning-non-slot
+    method = env["REQUEST_METHOD"]
 
     # Intercept OPTIONS requests
-    if request.method == "OPTIONS":
-        r = Response(status=200)
-        r.access_control_max_age = 3600 * 24
-        r.access_control_allow_methods = ["POST", "GET"]
-        r.access_control_allow_origin = config.CORS_ALLOW_ORIGIN
-        r.access_control_allow_headers = [
-            "Access-Control-Allow-Headers",
-            "Content-Type",
-            "Authorization",
-            "X-Requested-With"]
-        return r(env, start_response)
+    if method == "OPTIONS":
+        start_response("200 OK", list(OPTIONS_HEADERS))
+        return [b""]
+
+    request = Request(env)  # pylint: disable=assigning-non-slot
+    try:
+        path_info = get_path_info(env)
+        endpoint = route.match_static(path_info, method)
+        if endpoint is not None:
+            values = dict()
+        else:
+            # Fall back to Werkzeug's URL Map
+            url_map = route.url_map
+            urls = bind_url_map(url_map, env)
+            endpoint, values = urls.match(
+                path_info, method,
+                query_args=get_query_args(env, url_map.charset))
+    except NotFound as e:
+        # No route matched the URL
+        if config.HTML_NOT_FOUND:
+            return e(env, start_response)
+        start_response("404 NOT FOUND", list(NOT_FOUND_HEADERS))
+        return [NOT_FOUND_BODY]
+    except WZ_ROUTING_EXCEPTIONS as e:
+        return e(env, start_response)
+
     try:
-        endpoint, values = urls.match()
         response = endpoint(request, **values)
     except WZ_ROUTING_EXCEPTIONS as e:
         return e(env, start_response)
 
     # Add CORS headers to all responses
-    response.access_control_allow_origin = config.CORS_ALLOW_ORIGIN
-    response.access_control_allow_methods = ["POST", "GET"]
-    response.access_control_allow_headers = [
-        "Access-Control-Allow-Headers",
-        "Content-Type",
-        "Authorization",
-        "X-Requested-With"]
+    headers = response.headers
+    for key, value in CORS_HEADERS:
+        headers[key] = value
 
     return response(env, start_response)
 
@@ -196,3 +285,21 @@ def render_template(template_name, context=dict()):
 def OlafJSONEncoder(obj):
     if isinstance(obj, ObjectId):
         return str(obj)
+
+
+def json_dumps(obj):
+    """ Serializes obj to JSON, using orjson if installed.
+    Datetimes are passed to OlafJSONEncoder as well, and
+    values orjson refuses (e.g. integers wider than 64 bits)
+    are left to the json module, so both produce the same 
+    document. NaN and Infinity are the exception: orjson 
+    writes them as null, since they aren't valid JSON.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj, default=OlafJSONEncoder,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, default=OlafJSONEncoder)
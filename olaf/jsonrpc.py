@@ -11,6 +11,22 @@ from werkzeug.exceptions import BadRequest
 from werkzeug.local import Local
 
 _logger = logging.getLogger(__name__)
+conn = Connection()
+
+# Static error objects, see error_response()
+PARSE_ERROR = {"code": -32700, "message": "Parse error"}
+INVALID_REQUEST = {"code": -32600, "message": "Invalid Request"}
+METHOD_NOT_FOUND = {"code": -32601, "message": "Method not found"}
+
+
+def error_response(rpc_id, error, status):
+    """ Returns a JSONRPC error response """
+    return JsonResponse({
+        "id": rpc_id,
+        "error": error,
+        "jsonrpc": "2.0"
+    }, status=status)
+
 
 @route.add("/jsonrpc", methods=["POST", "OPTIONS"])
 @jwt_required
@@ -28,25 +44,17 @@ def jsonrpc_dispatcher(uid, request):
     try:
         data = request.get_json()
     except BadRequest:
-        return JsonResponse({
-            "id": None,
-            "error": {
-                "code": -32700,
-                "message": "Parse error"
-            },
-            "jsonrpc": "2.0"
-        }, status=400)
+        return error_response(None, PARSE_ERROR, 400)
+
+    # Ensure request is a JSON object.
+    # get_json() returns None if the mimetype isn't JSON.
+    if not isinstance(data, dict):
+        return error_response(None, INVALID_REQUEST, 400)
 
     # Ensure basic parameters are present
-    if not set(data).issubset({"id", "method", "params", "jsonrpc"}):
-        return JsonResponse({
-            "id": data["id"],
-            "error": {
-                "code": -32600,
-                "message": "Invalid Request"
-            },
-            "jsonrpc": "2.0"
-        }, status=400)
+    if "method" not in data or \
+            not set(data).issubset({"id", "method", "params", "jsonrpc"}):
+        return error_response(data.get("id"), INVALID_REQUEST, 400)
 
     status = 200
     # Handle CALL method
@@ -54,16 +62,16 @@ def jsonrpc_dispatcher(uid, request):
         try:
             res = handle_call(data, uid)
             result = {
-                "id": data["id"],
+                "id": data.get("id"),
                 "jsonrpc": "2.0",
                 "result": res
             }
         except Exception as e:
-            _logger.error("Exception during RPC Call: {}".format(str(e)))
+            _logger.error("Exception during RPC Call: %s", e)
             traceback.print_exc()
             status = 500
             result = {
-                "id": data["id"],
+                "id": data.get("id"),
                 "jsonrpc": "2.0",
                 "error": {
                     "code": -32000,
@@ -72,15 +80,7 @@ def jsonrpc_dispatcher(uid, request):
             }
     else:
         # Method not found
-        status = 500
-        result = {
-            "id": data["id"],
-            "error": {
-                "code": -32601,
-                "message": "Method not found"
-            },
-            "jsonrpc": "2.0"
-        }
+        return error_response(data.get("id"), METHOD_NOT_FOUND, 500)
 
     return JsonResponse(result, status=status)
 
@@ -96,7 +96,6 @@ def handle_call(data, uid):
     method = p["method"]
     cls = registry[p["model"]]
 
-    conn = Connection()
     client = conn.cl
 
     with client.start_session() as session:
@@ -108,40 +107,62 @@ def handle_call(data, uid):
     return result
 
 
+def _call_search(params, model):
+    return model.search(params.get("query", {})).ids
+
+
+def _call_read(params, model):
+    return model.browse(params.get("ids", [])).read(params.get("fields", []))
+
+
+def _call_count(params, model):
+    return model.search(params.get("query", {})).count()
+
+
+def _call_create(params, model):
+    args = params.get("args", [])
+    kwargs = params.get("kwargs", {})
+    return model.create(*args, **kwargs).read()
+
+
+def _call_search_read(params, model):
+    return model.search(params.get("query", {})).read(params.get("fields", []))
+
+
+def _call_unlink(params, model):
+    return model.browse(params.get("ids", [])).unlink()
+
+
+def _call_whoami(params, model):
+    return model.env["base.user"].browse(model.env.context["uid"]).read()[0]
+
+
+# Methods with a dedicated handler,
+# everything else is a generic method call.
+CALL_HANDLERS = {
+    "search":       _call_search,
+    "read":         _call_read,
+    "count":        _call_count,
+    "create":       _call_create,
+    "search_read":  _call_search_read,
+    "unlink":       _call_unlink,
+    "whoami":       _call_whoami,
+}
+
+
 def call_method(params, model, method):
-    if method == "search":
-        query = params.get("query", {})
-        result = model.search(query).ids
-    elif method == "read":
-        ids = params.get("ids", [])
-        fields = params.get("fields", [])
-        result = model.browse(ids).read(fields)
-    elif method == "count":
-        query = params.get("query", {})
-        result = model.search(query).count()
-    elif method == "create":
-        args = params.get("args", [])
-        kwargs = params.get("kwargs", {})
-        result = model.create(*args, **kwargs).read()
-    elif method == "search_read":
-        query = params.get("query", {})
-        fields = params.get("fields", [])
-        result = model.search(query).read(fields)
-    elif method == "unlink":
-        ids = params.get("ids", [])
-        result = model.browse(ids).unlink()
-    elif method == "whoami":
-        result = model.env["base.user"].browse(model.env.context["uid"]).read()[0]
-    else:
-        # Generic method call
-        ids =    params.get("ids", [])
-        docset = model.browse(ids)
-        args =   params.get("args", [])
-        kwargs = params.get("kwargs", {})
-        result = getattr(docset, method)(*args, **kwargs)
-        # Docsets must be serialized before being returned.
-        # This happens because PyMongo cursor can't be used
-        # outside the transaction.
-        if isinstance(result, Model):
-            result = result.read()
+    handler = CALL_HANDLERS.get(method)
+    if handler is not None:
+        return handler(params, model)
+    # Generic method call
+    ids =    params.get("ids", [])
+    docset = model.browse(ids)
+    args =   params.get("args", [])
+    kwargs = params.get("kwargs", {})
+    result = getattr(docset, method)(*args, **kwargs)
+    # Docsets must be serialized before being returned.
+    # This happens because PyMongo cursor can't be used
+    # outside the transaction.
+    if isinstance(result, Model):
+        result = result.read()
     return result
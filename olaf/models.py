@@ -1,7 +1,8 @@
 import logging
-from olaf.fields import BaseField, Identifier, Boolean, NoPersist, RelationalField, One2many, Many2one, Many2many
-from olaf.db import Connection
+from olaf.fields import BaseField, Identifier, Boolean, NoPersist, NO_DEFAULT, RelationalField, One2many, Many2one, Many2many
+from olaf.db import Connection, NoAutoFlush
 from bson import ObjectId
+from pymongo import IndexModel, DESCENDING
 from olaf import registry
 from olaf.security import check_access, build_DLS_query
 
@@ -25,10 +26,25 @@ class ModelMeta(type):
     """
 
     def __new__(mcs, cls, bases, dct):
-        for k, v in dct.items():
-            if isinstance(v, BaseField):
-                dct[k].attr = k
-        return super().__new__(mcs, cls, bases, dct)
+        # Fields get their attr through __set_name__
+        new_cls = super().__new__(mcs, cls, bases, dct)
+        # Collect fields (including inherited ones) just once
+        # per class, sorted by name as dir() would.
+        attrs = dict()
+        for klass in reversed(new_cls.__mro__):
+            attrs.update(vars(klass))
+        new_cls.__fields__ = {
+            k: attrs[k] for k in sorted(attrs) if isinstance(attrs[k], BaseField)}
+        # Index specs depend on the class definition only,
+        # so build them here and let the registry create them.
+        indexes = [
+            IndexModel([(ind, DESCENDING) for ind in tup_ind], unique=True)
+            for tup_ind in attrs.get("_compound_indexes", [])]
+        indexes.extend(
+            IndexModel(k, unique=True)
+            for k, field in new_cls.__fields__.items() if field._unique)
+        new_cls.__indexes__ = indexes
+        return new_cls
 
 
 class Model(metaclass=ModelMeta):
@@ -56,22 +72,16 @@ class Model(metaclass=ModelMeta):
             raise ValueError(
                 "Model {} attribute '_name' was not defined".format(
                     self.__class__.__name__))
-        # Create a dict of fields within this model
-        cls = self.__class__
-        fields = dict()
-        for attr_name in dir(cls):
-            attr = getattr(cls, attr_name)
-            if issubclass(attr.__class__, BaseField):
-                fields[attr_name] = attr
+        # Fields within this model (see ModelMeta)
         self.env = environment
-        self._fields = fields
+        self._fields = self.__fields__
         # Set default query
         self._query = {"$expr": {"$eq": [0, 1]}}
         if query is not None:
             self._query = query
         self._buffer = dict()
         self._implicit_save = True
-        self._cursor = conn.db[self._name].find(
+        self._cursor = conn.collection(self._name).find(
             self._query, session=self.env.session)
 
     def __repr__(self):
@@ -132,7 +142,7 @@ class Model(metaclass=ModelMeta):
             new_query = query
         
         # Perform the requested query
-        cursor = conn.db[self._name].find(new_query, session=self.env.session)
+        cursor = conn.collection(self._name).find(new_query, session=self.env.session)
         ids = [item["_id"] for item in cursor]
         
         return self.__class__(self.env, {"_id": {"$in": ids}})
@@ -174,7 +184,7 @@ class Model(metaclass=ModelMeta):
 
     def count(self):
         """ Return the amount of documents in the current set """
-        return conn.db[self._name].count_documents(self._query, session=self.env.session)
+        return conn.collection(self._name).count_documents(self._query, session=self.env.session)
 
     def create(self, vals_list):
         # Convert vals to list if a dict was provided
@@ -273,7 +283,7 @@ class Model(metaclass=ModelMeta):
         cache = dict()
         # By calling the list constructor on a PyMongo cursor we retrieve all the records
         # in a single call. This is faster but may take lots of memory.
-        data = list(conn.db[self._name].find(
+        data = list(conn.collection(self._name).find(
             self._query, {field: 1 for field in fields}, session=self.env.session))
         for field in fields:
             if issubclass(self._fields[field].__class__, RelationalField):
@@ -397,7 +407,7 @@ class Model(metaclass=ModelMeta):
                         "Invalid deletion constraint '{}'".format(cons))
 
         # Delete documents
-        outcome = conn.db[self._name].delete_many(
+        outcome = conn.collection(self._name).delete_many(
             self._query, session=self.env.session)
 
         # Delete any base.model.data documents
@@ -429,11 +439,11 @@ class Model(metaclass=ModelMeta):
         doc = self
         if len(base_dict.items()) > 0:
             if insert:
-                new_id = conn.db[self._name].insert_one(
+                new_id = conn.collection(self._name).insert_one(
                     base_dict, session=self.env.session).inserted_id
                 doc = self.__class__(self.env, {"_id": new_id})
             else:
-                conn.db[self._name].update_many(
+                conn.collection(self._name).update_many(
                     self._query, {"$set": base_dict}, session=self.env.session)
 
         # Insert x2m Fields
@@ -472,14 +482,14 @@ class Model(metaclass=ModelMeta):
                             # Check if field is marked as required
                             if field._required:
                                 # Check for a default value
-                                if hasattr(field, "_default"):
+                                if field._default is not NO_DEFAULT:
                                     vals[field_name] = field._default
                                 else:
                                     raise ValueError(
                                         "Missing value for required field '{}'".format(field_name))
                             else:
                                 # Value not present and not required
-                                if hasattr(field, "_default"):
+                                if field._default is not NO_DEFAULT:
                                     vals[field_name] = field._default
                                 else:
                                     vals[field_name] = None
@@ -506,9 +516,13 @@ class Model(metaclass=ModelMeta):
         """ Returns a list of ObjectIds contained 
         in the current DocSet
         """
+        # Read ids straight from the documents, rather
+        # than building a single-document DocSet for each.
+        cursor = conn.collection(self._name).find(
+            self._query, {"_id": 1}, session=self.env.session)
         if as_strings:
-            return [str(item._id) for item in self]
-        return [item._id for item in self]
+            return [str(doc["_id"]) for doc in cursor]
+        return [doc["_id"] for doc in cursor]
 
     def mapped(self, field):
         if not field in self._fields:
@@ -582,7 +596,10 @@ class Model(metaclass=ModelMeta):
 
     def load(self, fields, data):
         """ A recursive data loader"""
-        ids, errors = self._load(fields, data)
+        # Keep the whole import queued,
+        # so it can be discarded on errors.
+        with NoAutoFlush(self.env.cache):
+            ids, errors = self._load(fields, data)
         if len(errors) > 0:
             self.env.cache.clear()
             return {"ids": [], "errors": errors }
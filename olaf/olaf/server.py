@@ -5,21 +5,16 @@ from olaf.http import Request, Response, route, dispatch
 from olaf.tools import initialize, config
 from olaf.storage import AppContext
 from werkzeug.serving import run_simple
-from werkzeug.local import Local, LocalManager
 from werkzeug.middleware.shared_data import SharedDataMiddleware
 
 
-class Olaf(object):
-
-    def __call__(self, env, start_response):
-        return dispatch(env, start_response)
-
-
 def create_app():
-    local = Local()
-    local_manager = LocalManager([local])
-    app = local_manager.make_middleware(Olaf())
-    app = set_statics(app)
+    # The dispatcher is a plain WSGI callable,
+    # so there's no need to wrap it any further.
+    app = dispatch
+    # Static files may be served by a reverse proxy instead
+    if config.SERVE_STATIC_IN_APP:
+        app = set_statics(app)
     return app
 
 
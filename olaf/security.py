@@ -10,6 +10,8 @@ from olaf.tools.environ import Environment
 from werkzeug.exceptions import BadRequest
 from werkzeug.security import check_password_hash
 
+conn = Connection()
+
 acl_operation_field_map = {
     "read":     "allow_read",
     "write":    "allow_write",
@@ -31,7 +33,7 @@ def jwt_required(func, *args, **kwargs):
     """
     def function_wrapper(*args, **kwargs):
         request = args[0]
-        access_token = request.headers.get("Authorization", None)
+        access_token = request.environ.get("HTTP_AUTHORIZATION", None)
 
         # Make sure header is present and it's valid
         if not access_token or not access_token.startswith("Bearer "):
@@ -56,7 +58,6 @@ def jwt_required(func, *args, **kwargs):
             return JsonResponse({"msg": "Invalid Token"}, status=401)
 
         # Verify if user exists in database
-        conn = Connection()
         user = conn.db["base.user"].find_one({"_id": oid})
         
         if not user:
@@ -87,7 +88,6 @@ def token(request):
     if not "email" in data or not "password" in data:
         return JsonResponse({"msg": "Malformed Request"}, status=400)
 
-    conn = Connection()
     user = conn.db["base.user"].find_one({"email": data["email"]})
 
     # Check user exists
@@ -129,7 +129,6 @@ def check_access(docset, operation, skip_DLS=False):
     if uid == ObjectId("000000000000000000000000"):
         return
 
-    conn = Connection()
     user = conn.db["base.user"].find_one({"_id": uid }, session=session)
     if not user:
         raise AccessError("User not found")
@@ -166,7 +165,6 @@ def check_ACL(model_name, operation, groups, user, session):
 
     # Search for ACL Rules associated to all of these groups
     # and also for ACL Ruless not associated to any group (Globals)
-    conn = Connection()
     acl_rules = conn.db["base.acl"].find(
         {
             "active": True,
@@ -256,8 +254,6 @@ def build_DLS_query(model_name, operation, groups, user, session):
     if user == ObjectId("000000000000000000000000"):
         return False
 
-    conn = Connection()
-    
     # Search for DLS Rules associated to all of these groups
     group_rules = conn.db["base.dls"].find({
         "active": True,
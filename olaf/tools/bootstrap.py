@@ -200,14 +200,14 @@ def initialize(loglevel="info"):
                         fname = os.path.join(
                             module_data["path"], module_name, _file)
                         logger.debug(
-                            "Loading data file '{}' for module '{}'".format(_file, module_name))
+                            "Loading data file '%s' for module '%s'", _file, module_name)
                         load_data(env, fname)
                 if "security" in module_data["manifest"]:
                     for _file in module_data["manifest"]["security"]:
                         fname = os.path.join(
                             module_data["path"], module_name, _file)
                         logger.debug(
-                            "Loading security file '{}' for module '{}'".format(_file, module_name))
+                            "Loading security file '%s' for module '%s'", _file, module_name)
                         load_data(env, fname, True)
 
                 # Flag module as installed
@@ -223,6 +223,10 @@ def initialize(loglevel="info"):
                 env = Environment(root_uid, session)
                 load_file_data(env, module_name, module_data)
 
+    # Import framework submodules (models, routes)
+    from olaf import bootstrap
+    bootstrap()
+
     signal.signal(signal.SIGTERM, app_shutdown)
     signal.signal(signal.SIGINT, app_shutdown)
 
@@ -233,6 +237,9 @@ def initialize(loglevel="info"):
     # Read All Modules
     color = click.style
     logger.info(color("Initializing Olaf", fg="white", bold=True))
+    # Fail early if database is unreachable
+    if config.DB_VERIFY_ON_START:
+        Connection().verify()
     # Ensure root user exists
     ensure_root_user()
     modules = manifest_parser()
@@ -306,7 +313,7 @@ def scan_addons_dir(addons_dir, modules_dict, base=False):
                     # Absolute path to directory
                     cur_dir = os.path.join(root, _dir)
                     logger.debug(
-                        "Parsing Manifest File at {}".format(cur_dir))
+                        "Parsing Manifest File at %s", cur_dir)
                     manifest = yaml.safe_load(
                         open(os.path.join(cur_dir, file)))
                     # Verify if module contains a static folder
@@ -392,7 +399,6 @@ def app_shutdown(sifnum, frame):
     logger.info("Attempting to stop Olaf gracefully...")
     sch = Scheduler()
     sch.stop()
-    sch.process.join()
     color = click.style
     logger.info(color("Goodbye!", fg="white", bold=True))
     sys.exit(0)
\ No newline at end of file
@@ -32,6 +32,8 @@ class Config:
     APP_PORT =              Setting("int",  os.environ.get("APP_PORT", 5000))
     APP_DEBUG =             Setting("bool", os.environ.get("APP_DEBUG", False))
     APP_RELOAD =            Setting("bool", os.environ.get("APP_RELOAD", False))
+    HTML_NOT_FOUND =        Setting("bool", os.environ.get("HTML_NOT_FOUND", True))
+    SERVE_STATIC_IN_APP =   Setting("bool", os.environ.get("SERVE_STATIC_IN_APP", True))
     SECRET_KEY =            Setting("str",  os.getenv("SECRET_KEY", "SoMeThInGrEaLlYhArDtOgUeSs"))
     DB_NAME =               Setting("str",  os.getenv("MONGODB_NAME", "olaf"))
     DB_PASS =               Setting("str",  os.getenv("MONGODB_PASS", None))
@@ -40,6 +42,11 @@ class Config:
     DB_PORT =               Setting("int",  os.getenv("MONGODB_PORT", 27017))
     DB_TOUT =               Setting("int",  os.getenv("MONGODB_TIMEOUT", 2000))
     DB_REPLICASET_ID =      Setting("str",  os.getenv("MONGODB_REPLICASET_ID", "rs0"))
+    DB_COMPRESSORS =        Setting("str",  os.getenv("MONGODB_COMPRESSORS", ""))
+    DB_POOL_MAX =           Setting("int",  os.getenv("MONGODB_POOL_MAX", 100))
+    DB_POOL_MIN =           Setting("int",  os.getenv("MONGODB_POOL_MIN", 0))
+    DB_VERIFY_ON_START =    Setting("bool", os.getenv("MONGODB_VERIFY_ON_START", True))
+    DB_CACHE_THRESHOLD =    Setting("int",  os.getenv("MONGODB_CACHE_THRESHOLD", 1000))
     JWT_EXPIRATION_TIME =   Setting("int",  os.getenv("JWT_EXPIRATION_TIME", 2000))
     ROOT_PASSWORD =         Setting("str",  os.getenv("ROOT_PASSWORD", "olaf"))
     EXTRA_ADDONS =          Setting("str",  os.getenv("EXTRA_ADDONS", ""))
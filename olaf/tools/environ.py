@@ -1,5 +1,6 @@
 from olaf import registry
 from olaf.db import Connection, DocumentCache
+from olaf.tools import config
 from frozendict import frozendict
 
 class Environment(object):
@@ -11,7 +12,8 @@ class Environment(object):
         self.session =  session
         self.registry = registry
         self.conn =     Connection()
-        self.cache =    DocumentCache(session)
+        self.cache =    DocumentCache(
+            session, threshold=config.DB_CACHE_THRESHOLD or None)
 
     def __iter__(self):
         return iter(self.registry)
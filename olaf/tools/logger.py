@@ -10,24 +10,33 @@ def setup_logger(logger, level=logging.INFO):
     sh.setFormatter(formatter)
     color = click.style
 
+    # Styled level names are built once per (levelno, levelname)
+    # pair instead of once per record.
+    styled_names = dict()
+
     def decorate_emit(fn):
     # add methods we need to the class
         def new(*args):
             levelno = args[0].levelno
-            if(levelno >= logging.CRITICAL):
-                colname = 'magenta'
-            elif(levelno >= logging.ERROR):
-                colname = 'red'
-            elif(levelno >= logging.WARNING):
-                colname = 'yellow'
-            elif(levelno >= logging.INFO):
-                colname = 'green'
-            elif(levelno >= logging.DEBUG):
-                colname = 'cyan'
-            else:
-                colname = 'white'
+            key = (levelno, args[0].levelname)
+            styled = styled_names.get(key)
+            if styled is None:
+                if(levelno >= logging.CRITICAL):
+                    colname = 'magenta'
+                elif(levelno >= logging.ERROR):
+                    colname = 'red'
+                elif(levelno >= logging.WARNING):
+                    colname = 'yellow'
+                elif(levelno >= logging.INFO):
+                    colname = 'green'
+                elif(levelno >= logging.DEBUG):
+                    colname = 'cyan'
+                else:
+                    colname = 'white'
+                styled = color(args[0].levelname, fg=colname, bold=True)
+                styled_names[key] = styled
 
-            args[0].levelname = color(args[0].levelname, fg=colname, bold=True)
+            args[0].levelname = styled
 
             return fn(*args)
         return new
@@ -53,6 +53,9 @@ builtins = {
 }
 
 def safe_eval(code, _locals={}):
+    """ Evaluates either a string or a code object
+    previously compiled in 'eval' mode.
+    """
     # if '__' in code:
     #     raise SecurityException()
     return eval(code, {'__builtins__': builtins}, _locals)
@@ -0,0 +1,130 @@
+import time
+import pytest
+import datetime
+from bson import ObjectId
+from olaf import registry
+from olaf.db import Connection
+from olaf.cron import Scheduler
+from olaf.tools.environ import Environment
+
+uid = ObjectId("000000000000000000000000")
+env = Environment(uid)
+self = registry["base.user"](env, {"_id": uid})
+conn = Connection()
+
+
+def job_vals(name, **kwargs):
+    vals = {
+        "name": name,
+        "status": "idle",
+        "nextcall": datetime.datetime.now() + datetime.timedelta(days=1),
+        "interval": 1,
+        "interval_type": "hours",
+        "user_id": uid,
+        "code": "None"
+    }
+    vals.update(kwargs)
+    return vals
+
+
+@pytest.fixture
+def resets(monkeypatch):
+    """ Count scheduler resets """
+    calls = list()
+    cron = registry["base.cron"]
+    monkeypatch.setattr(cron, "_reset_scheduler", lambda rec: calls.append(rec))
+    return calls
+
+
+def test_cron_create_reset(resets):
+    """ Only active jobs reset the scheduler on create """
+    self.env["base.cron"].create(job_vals("test_cron_inactive", active=False))
+    assert(len(resets) == 0)
+    self.env["base.cron"].create(job_vals("test_cron_active"))
+    assert(len(resets) == 1)
+
+
+def test_cron_write_reset(resets):
+    """ Only writes on scheduled fields reset the scheduler """
+    job = self.env["base.cron"].search({"name": "test_cron_active"})
+    job.status = "running"
+    job.write({"status": "idle"})
+    assert(len(resets) == 0)
+    job.interval = 2
+    assert(len(resets) == 1)
+    job.write({"status": "idle", "active": False})
+    assert(len(resets) == 2)
+
+
+def test_scheduler_loop():
+    """ Due jobs run in nextcall order and get rescheduled,
+    overdue jobs are pushed forward when the scheduler starts
+    """
+    now = datetime.datetime.now()
+    jobs = conn.db["base.cron"]
+    oid_a, oid_b, oid_c = ObjectId(), ObjectId(), ObjectId()
+    for oid, nextcall in [
+            (oid_a, now + datetime.timedelta(seconds=2)),
+            (oid_b, now + datetime.timedelta(seconds=1)),
+            (oid_c, now - datetime.timedelta(hours=2))]:
+        jobs.insert_one({
+            **job_vals("test_cron_loop", nextcall=nextcall),
+            "_id": oid,
+            "active": True})
+
+    # The app's Scheduler is disabled in shell context,
+    # so run a separate instance of it.
+    sch = object.__new__(Scheduler)
+    sch.__init__()
+    ran = list()
+    sch.run = lambda job: ran.append(job["_id"])
+    sch._disabled = False
+    sch.start()
+    try:
+        # Overdue job was pushed forward, but didn't run
+        assert(jobs.find_one({"_id": oid_c})["nextcall"] > now)
+        time.sleep(3)
+    finally:
+        sch.stop()
+
+    ran = [oid for oid in ran if oid in (oid_a, oid_b, oid_c)]
+    assert(ran == [oid_b, oid_a])
+    for oid in [oid_a, oid_b, oid_c]:
+        nextcall = jobs.find_one({"_id": oid})["nextcall"]
+        assert(nextcall > now + datetime.timedelta(minutes=59))
+
+
+def test_scheduler_skips_non_positive_intervals():
+    """ Jobs whose interval is zero or negative are not
+    loaded, so they can't make the loop spin
+    """
+    now = datetime.datetime.now()
+    jobs = conn.db["base.cron"]
+    oids = [ObjectId(), ObjectId()]
+    for oid, interval in zip(oids, [0, -1]):
+        jobs.insert_one({
+            **job_vals(
+                "test_cron_loop", interval=interval,
+                nextcall=now + datetime.timedelta(milliseconds=500)),
+            "_id": oid,
+            "active": True})
+
+    sch = object.__new__(Scheduler)
+    sch.__init__()
+    ran = list()
+    sch.run = lambda job: ran.append(job["_id"])
+    sch._disabled = False
+    sch.start()
+    try:
+        assert(not any(oid in sch.jobs for oid in oids))
+        time.sleep(1.5)
+    finally:
+        sch.stop()
+
+    assert(not any(oid in ran for oid in oids))
+
+
+def test_finish():
+    """ Clean previous tests """
+    conn.db["base.cron"].delete_many(
+        {"name": {"$in": ["test_cron_inactive", "test_cron_active", "test_cron_loop"]}})
@@ -0,0 +1,144 @@
+import pytest
+import pymongo
+from bson import ObjectId
+from olaf import registry, fields, models
+from olaf.db import Connection, DocumentCache, NoAutoFlush
+from olaf.tools import initialize
+from olaf.tools.environ import Environment
+
+uid = ObjectId("000000000000000000000000")
+env = Environment(uid)
+conn = Connection()
+
+
+@registry.add
+class tModel(models.Model):
+    _name = "test.db.model"
+
+    name = fields.Char()
+
+
+@registry.add
+class tCoModel(models.Model):
+    _name = "test.db.comodel"
+
+    name = fields.Char()
+
+
+# Initialize App Engine After All Model Classes Are Declared
+initialize()
+
+
+def count(query={}, model="test.db.model"):
+    return conn.db[model].count_documents(query)
+
+
+def find(oid, model="test.db.model"):
+    return conn.db[model].find_one({"_id": oid})
+
+
+def test_cache_threshold():
+    """ Cache flushes itself once it holds
+    as many operations as its threshold
+    """
+    cache = DocumentCache(threshold=2)
+    cache.append("create", "test.db.model", None, {"_id": ObjectId(), "name": "th_a"})
+    assert(count({"name": "th_a"}) == 0)
+    cache.append("create", "test.db.model", None, {"_id": ObjectId(), "name": "th_a"})
+    # Threshold reached, both documents were inserted
+    assert(count({"name": "th_a"}) == 2)
+    assert(len(cache.__queue__) == 0)
+
+
+def test_cache_no_auto_flush():
+    """ Operations queued within NoAutoFlush
+    can still be discarded
+    """
+    cache = DocumentCache(threshold=2)
+    with NoAutoFlush(cache):
+        for _ in range(3):
+            cache.append("create", "test.db.model", None, {"_id": ObjectId(), "name": "th_b"})
+    assert(count({"name": "th_b"}) == 0)
+    cache.clear()
+    # Threshold is restored after the block
+    assert(cache.__threshold__ == 2)
+    assert(count({"name": "th_b"}) == 0)
+
+
+def test_cache_order():
+    """ Operations are applied in the order they were
+    queued, both within a model and among models
+    """
+    cache = DocumentCache()
+    oid_a, oid_b = ObjectId(), ObjectId()
+    cache.append("create", "test.db.model", None, {"_id": oid_a, "name": "ord_1"})
+    cache.append("create", "test.db.comodel", None, {"_id": oid_b, "name": "ord_1"})
+    cache.append("write", "test.db.model", oid_a, {"name": "ord_2"})
+    cache.append("delete", "test.db.model", oid_a)
+    # Same _id again, only valid after the delete
+    cache.append("create", "test.db.model", None, {"_id": oid_a, "name": "ord_3"})
+    cache.append("write", "test.db.comodel", oid_b, {"name": "ord_2"})
+    cache.append("write", "test.db.model", oid_a, {"name": "ord_4"})
+    cache.flush()
+    assert(find(oid_a)["name"] == "ord_4")
+    assert(find(oid_b, "test.db.comodel")["name"] == "ord_2")
+    assert(len(cache.__queue__) == 0)
+    assert(not cache.is_pending(oid_a))
+
+
+def test_cache_write_merge():
+    """ Consecutive writes on the same documents
+    are merged into a single operation
+    """
+    cache = DocumentCache()
+    oid_a, oid_b = ObjectId(), ObjectId()
+    cache.append("create", "test.db.model", None, [
+        {"_id": oid_a, "name": "mrg_1"}, {"_id": oid_b, "name": "mrg_1"}])
+    cache.append("write", "test.db.model", [oid_a, oid_b], {"name": "mrg_2"})
+    cache.append("write", "test.db.model", [oid_a, oid_b], {"name": "mrg_3"})
+    assert(len(cache.__queue__) == 2)
+    assert(cache.__queue__[-1][3] == {"name": "mrg_3"})
+    # Writes on other documents are kept apart
+    cache.append("write", "test.db.model", oid_a, {"name": "mrg_4"})
+    assert(len(cache.__queue__) == 3)
+    cache.flush()
+    assert(find(oid_a)["name"] == "mrg_4")
+    assert(find(oid_b)["name"] == "mrg_3")
+
+
+def test_cache_oid_collections():
+    """ Tuples and sets of oids are accepted """
+    cache = DocumentCache()
+    oids = [ObjectId() for _ in range(3)]
+    cache.append("create", "test.db.model", None, [
+        {"_id": oid, "name": "col_1"} for oid in oids])
+    cache.append("write", "test.db.model", tuple(oids[:2]), {"name": "col_2"})
+    cache.append("delete", "test.db.model", set(oids[2:]))
+    assert(all(isinstance(tpl[2], list) for tpl in cache.__queue__))
+    cache.flush()
+    assert(count({"name": "col_2"}) == 2)
+    assert(find(oids[2]) is None)
+
+
+def test_cache_clear_on_error():
+    """ Cache is cleared when flushing fails. Since runs
+    of inserts are unordered, the rest of them still
+    make it into database.
+    """
+    cache = DocumentCache()
+    oid_a, oid_b = ObjectId(), ObjectId()
+    cache.append("create", "test.db.model", None, {"_id": oid_a, "name": "err_1"})
+    cache.append("create", "test.db.model", None, {"_id": oid_a, "name": "err_1"})
+    cache.append("create", "test.db.model", None, {"_id": oid_b, "name": "err_1"})
+    with pytest.raises(pymongo.errors.BulkWriteError):
+        cache.flush()
+    assert(len(cache.__queue__) == 0)
+    assert(not cache.is_pending(oid_a))
+    assert(not cache.is_pending(oid_b))
+    assert(count({"name": "err_1"}) == 2)
+
+
+def test_finish():
+    """ Clean previous tests """
+    conn.db["test.db.model"].delete_many({})
+    conn.db["test.db.comodel"].delete_many({})
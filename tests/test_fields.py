@@ -4,6 +4,7 @@ from bson import ObjectId
 from olaf import db, registry, fields
 from olaf.tools import initialize
 from olaf.models import Model
+from olaf.fields import NoPersist
 from olaf.tools.environ import Environment
 
 uid = ObjectId("000000000000000000000000")
@@ -300,6 +301,40 @@ def test_m2m():
         rec.m2m = [('create', {"name": "m2m_6"})]
 
 
+def test_x2m_deferred():
+    """ Purge and remove assignments done within
+    NoPersist are queued, and applied on flush
+    """
+    # One2many
+    rec = self.env["TestCoModel"].create({"char": "O2M Deferred"})
+    rec.o2m = [('create', {"char_max_req": "o2md_1"}),
+               ('create', {"char_max_req": "o2md_2"})]
+    purged = self.env["TestModel"].search({"char_max_req": "o2md_1"})._id
+    removed = self.env["TestModel"].search({"char_max_req": "o2md_2"})._id
+    with NoPersist(rec):
+        rec.o2m = [('purge', purged), ('remove', removed)]
+    # Nothing was written yet
+    assert(rec.o2m.count() == 2)
+    rec.env.cache.flush()
+    assert(rec.o2m.count() == 0)
+    assert(self.env["TestModel"].browse(purged).count() == 0)
+    assert(self.env["TestModel"].browse(removed).count() == 1)
+
+    # Many2many
+    rec = self.env["TestModel"].create({"char_max_req": "m2md_1"})
+    rec.m2m = [('create', {"name": "m2md_tag_1"}),
+               ('create', {"name": "m2md_tag_2"})]
+    purged = self.env["TestTagModel"].search({"name": "m2md_tag_1"})._id
+    removed = self.env["TestTagModel"].search({"name": "m2md_tag_2"})._id
+    with NoPersist(rec):
+        rec.m2m = [('purge', purged), ('remove', removed)]
+    assert(rec.m2m.count() == 2)
+    rec.env.cache.flush()
+    assert(rec.m2m.count() == 0)
+    assert(self.env["TestTagModel"].browse(purged).count() == 0)
+    assert(self.env["TestTagModel"].browse(removed).count() == 1)
+
+
 def test_unicity():
     """ Make sure unique fields are unique """
     self.env["TestTagModel"].create({"name": "test_tag_1"})
@@ -0,0 +1,135 @@
+import json
+import pytest
+import datetime
+from bson import ObjectId
+from werkzeug.routing import Map, Rule, RequestRedirect
+from werkzeug.exceptions import NotFound
+from werkzeug.test import EnvironBuilder
+from olaf import http
+
+
+url_map = Map([
+    Rule("/plain", endpoint="plain"),
+    Rule("/item/<int:item_id>", endpoint="item"),
+    Rule("/folder/", endpoint="folder"),
+])
+
+
+def build_env(path, **kwargs):
+    return EnvironBuilder(path=path, **kwargs).get_environ()
+
+
+def match_both(env):
+    """ Match env with both bind_to_environ and
+    bind_url_map, returning both outcomes """
+    outcomes = list()
+    for urls in [
+            url_map.bind_to_environ(env),
+            http.bind_url_map(url_map, env)]:
+        try:
+            outcomes.append(urls.match(
+                http.get_path_info(env), env["REQUEST_METHOD"],
+                query_args=http.get_query_args(env, url_map.charset)))
+        except RequestRedirect as e:
+            outcomes.append(e.new_url)
+    return outcomes
+
+
+@pytest.mark.parametrize("path, kwargs", [
+    ("/plain", {}),
+    ("/item/12", {}),
+    ("/item/12", {"base_url": "http://Example.COM:8080/"}),
+    # Redirects carry host, script name and query args along
+    ("/folder", {"query_string": "a=1&b=é"}),
+    ("/folder", {"base_url": "https://example.com/räiz/"}),
+])
+def test_bind_url_map(path, kwargs):
+    """ bind_url_map must behave just like bind_to_environ """
+    env = build_env(path, **kwargs)
+    old, new = match_both(env)
+    assert(old == new)
+    old_urls = url_map.bind_to_environ(env)
+    new_urls = http.bind_url_map(url_map, env)
+    assert(old_urls.server_name == new_urls.server_name)
+    assert(old_urls.script_name == new_urls.script_name)
+    assert(old_urls.subdomain == new_urls.subdomain)
+    assert(old_urls.url_scheme == new_urls.url_scheme)
+
+
+def test_bind_url_map_bounded():
+    """ Adapters are only kept for a limited amount of hosts """
+    http.URL_ADAPTERS.clear()
+    for i in range(http.URL_ADAPTERS_MAX + 10):
+        env = build_env("/plain", base_url="http://host{}.com/".format(i))
+        urls = http.bind_url_map(url_map, env)
+        assert(urls.server_name == "host{}.com".format(i))
+    assert(len(http.URL_ADAPTERS) == http.URL_ADAPTERS_MAX)
+    # First hosts are still cached
+    env = build_env("/plain", base_url="http://host0.com/")
+    assert(http.bind_url_map(url_map, env) is http.bind_url_map(url_map, env))
+
+
+def call_dispatch(env):
+    """ Run dispatch and return status, headers and body """
+    started = dict()
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = status
+        started["headers"] = dict(headers)
+
+    body = b"".join(http.dispatch(env, start_response))
+    return started["status"], started["headers"], body
+
+
+def test_dispatch_not_found(monkeypatch):
+    """ NotFound raised by an endpoint keeps its description,
+    unmatched URLs get the standard 404 page """
+    def endpoint(request):
+        raise NotFound("Record 42 is gone")
+
+    monkeypatch.setitem(
+        http.route.static_map, ("GET", "/test/not/found"), endpoint)
+    status, headers, body = call_dispatch(build_env("/test/not/found"))
+    assert(status.startswith("404"))
+    assert(b"Record 42 is gone" in body)
+
+    status, headers, body = call_dispatch(build_env("/test/no/such/route"))
+    assert(status.startswith("404"))
+    assert(headers["Content-Type"].startswith("text/html"))
+
+
+oid = ObjectId()
+json_data = {
+    "_id": oid,
+    "int": 1,
+    "big": 2 ** 70,
+    "date": datetime.datetime(2020, 1, 1),
+    2: "non-str key",
+    "list": [oid, None, "é"],
+}
+json_expected = {
+    "_id": str(oid),
+    "int": 1,
+    "big": 2 ** 70,
+    "date": None,
+    "2": "non-str key",
+    "list": [str(oid), None, "é"],
+}
+
+
+def test_json_dumps_fallback(monkeypatch):
+    """ Serialization through the json module """
+    monkeypatch.setattr(http, "orjson", None)
+    assert(json.loads(http.json_dumps(json_data)) == json_expected)
+
+
+def test_json_dumps_orjson():
+    """ Serialization through orjson matches the json module """
+    pytest.importorskip("orjson")
+    assert(json.loads(http.json_dumps(json_data)) == json_expected)
+    # orjson handles non-str keys by itself (it returns bytes)
+    data = {key: value for key, value in json_data.items() if key != "big"}
+    expected = {key: value for key, value in json_expected.items() if key != "big"}
+    dumped = http.json_dumps(data)
+    assert(isinstance(dumped, bytes))
+    assert(json.loads(dumped) == expected)
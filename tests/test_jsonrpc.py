@@ -0,0 +1,87 @@
+import json
+import datetime
+import jwt
+import pytest
+from werkzeug.test import EnvironBuilder
+from olaf import http
+from olaf.tools import config
+
+uid = "000000000000000000000000"
+
+
+def access_token():
+    expires = datetime.datetime.now() + datetime.timedelta(seconds=60)
+    payload = {"uid": uid, "expires": expires.isoformat()}
+    return jwt.encode(payload, key=config.SECRET_KEY).decode('utf-8')
+
+
+def rpc(data, content_type="application/json"):
+    """ POST data to the JSONRPC endpoint, returning
+    the response status code and its decoded body
+    """
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    env = EnvironBuilder(
+        path="/jsonrpc",
+        method="POST",
+        data=data,
+        content_type=content_type,
+        headers={"Authorization": "Bearer {}".format(access_token())}
+    ).get_environ()
+    started = dict()
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ")[0])
+
+    body = b"".join(http.dispatch(env, start_response))
+    return started["status"], json.loads(body)
+
+
+def assert_error(response, status, rpc_id, code):
+    assert(response[0] == status)
+    assert(response[1]["jsonrpc"] == "2.0")
+    assert(response[1]["id"] == rpc_id)
+    assert(response[1]["error"]["code"] == code)
+
+
+def test_parse_error():
+    assert_error(rpc("{not json"), 400, None, -32700)
+
+
+def test_invalid_request():
+    # Body is not a JSON object
+    assert_error(rpc([1, 2, 3]), 400, None, -32600)
+    # Body was not sent as JSON
+    assert_error(rpc("call", content_type="text/plain"), 400, None, -32600)
+    # Method is missing
+    assert_error(rpc({"id": 1, "params": {}}), 400, 1, -32600)
+    # Unknown member
+    assert_error(rpc({"id": 2, "method": "call", "other": 0}), 400, 2, -32600)
+
+
+def test_method_not_found():
+    assert_error(rpc({"id": 3, "method": "nope"}), 500, 3, -32601)
+
+
+def test_call():
+    status, body = rpc({
+        "id": 4,
+        "method": "call",
+        "params": {"model": "base.user", "method": "count"}})
+    assert(status == 200)
+    assert(body["id"] == 4)
+    assert(isinstance(body["result"], int))
+    # Id is optional
+    status, body = rpc({
+        "method": "call",
+        "params": {"model": "base.user", "method": "count"}})
+    assert(status == 200)
+    assert(body["id"] is None)
+
+
+def test_call_error():
+    status, body = rpc({
+        "id": 5,
+        "method": "call",
+        "params": {"model": "base.user", "method": "no_such_method"}})
+    assert_error((status, body), 500, 5, -32000)